@@ -1,13 +1,14 @@
 import asyncio
+import datetime
 import functools
 import inspect
 import json
 import re
-from typing import TYPE_CHECKING, Any, Callable
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Optional
 
 from fastapi import HTTPException, status
 from openai.error import InvalidRequestError
-from pydantic import Field, validator
+from pydantic import Field, PrivateAttr, validator
 
 import marvin
 from marvin.bot.history import History, ThreadHistory
@@ -20,17 +21,155 @@ from marvin.bot.response_formatters import (
 from marvin.models.ids import BotID, ThreadID
 from marvin.models.threads import BaseMessage, Message
 from marvin.plugins import Plugin
-from marvin.utilities.async_utils import as_sync_fn
-from marvin.utilities.strings import condense_newlines, jinja_env
+from marvin.utilities.async_utils import as_sync_fn, run_async
+from marvin.utilities.strings import condense_newlines, hash_text, jinja_env
 from marvin.utilities.types import LoggerMixin, MarvinBaseModel
 
-PLUGINS_REGEX = re.compile(r'({\s*"mode":\s*"plugins".*})', re.DOTALL)
+PLUGINS_PAYLOAD_START = re.compile(r'{\s*"mode"\s*:\s*"plugins"')
+JSON_STRUCTURE = re.compile(r'[{}"\\]')
+
+
+class PluginsPayloadScanner:
+    """
+    Incrementally locates a `{"mode": "plugins", ...}` JSON object in text
+    that arrives in chunks, such as a streaming LLM response.
+
+    Once the opening of the payload is found, only the braces, quotes, and
+    escapes after it are examined, so braces inside JSON strings are ignored
+    and the payload ends at its matching closing brace. Each chunk is scanned
+    once.
+    """
+
+    # the opening of a payload may be split across chunks, so each search
+    # looks back over the end of the previous text
+    _LOOKBACK = 64
+
+    def __init__(self):
+        self.text = ""
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped_index = None
+
+    @property
+    def payload(self) -> Optional[str]:
+        """
+        The payload, if one was found. If the payload has not been closed, the
+        remainder of the text is returned so that parsing it reports an error.
+        """
+        if self.start is None:
+            return None
+        return self.text[self.start : self.end]
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Add a chunk of text and return True if a complete payload has been
+        received.
+        """
+        self.text += chunk
+        if self.end is not None:
+            return True
+
+        if self.start is None:
+            match = PLUGINS_PAYLOAD_START.search(
+                self.text, max(self._position - self._LOOKBACK, 0)
+            )
+            if match is None:
+                self._position = len(self.text)
+                return False
+            self.start = self._position = match.start()
+
+        for token in JSON_STRUCTURE.finditer(self.text, self._position):
+            char, index = token.group(), token.start()
+            if index == self._escaped_index:
+                continue
+            elif self._in_string:
+                if char == "\\":
+                    self._escaped_index = index + 1
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = index + 1
+                    return True
+
+        self._position = len(self.text)
+        return False
+
+
+def find_plugins_payload(text: str) -> Optional[str]:
+    """
+    Extract the first `{"mode": "plugins", ...}` JSON object from a response.
+    If the payload is never closed, the remainder of the text is returned so
+    that parsing it reports an error.
+    """
+    scanner = PluginsPayloadScanner()
+    scanner.feed(text)
+    return scanner.payload
+
+
+_llm_utilities = None
+
+
+def _get_llm_utilities():
+    """
+    Import `marvin.utilities.llms` on first use, since it loads langchain, and
+    keep a reference so later calls skip the import machinery.
+    """
+    global _llm_utilities
+    if _llm_utilities is None:
+        import marvin.utilities.llms
+
+        _llm_utilities = marvin.utilities.llms
+    return _llm_utilities
+
+
+_date_cache: Optional[tuple[datetime.date, str]] = None
+
+
+def _today_string() -> str:
+    """
+    Today's UTC date, formatted like "Monday, January 2, 2023". The date is
+    given at day granularity so it is stable all day, and only formatted once
+    per day.
+    """
+    global _date_cache
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    if _date_cache is None or _date_cache[0] != today:
+        _date_cache = (today, f"{today:%A, %B} {today.day}, {today.year}")
+    return _date_cache[1]
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_template(source: str):
+    return jinja_env.from_string(source)
 
 
 class BotResponse(BaseMessage):
     parsed_content: Any = None
 
 
+class BotStreamToken(MarvinBaseModel):
+    """
+    A token yielded by `Bot.stream`. The bot calls the LLM again after running
+    plugins, so each token records the call (`round`) it came from; the bot's
+    response is made of the tokens from the last round.
+    """
+
+    content: str
+    round: int
+    plugins_payload: bool = Field(
+        False, description="Whether the token is part of a plugins payload."
+    )
+
+
 MAX_VALIDATION_ATTEMPTS = 3
 
 if TYPE_CHECKING:
@@ -38,11 +177,11 @@ if TYPE_CHECKING:
 DEFAULT_NAME = "Marvin"
 DEFAULT_DESCRIPTION = "A Marvin bot"
 DEFAULT_PERSONALITY = "A helpful assistant that is clever, witty, and fun."
-DEFAULT_INSTRUCTIONS = """
+DEFAULT_INSTRUCTIONS = condense_newlines("""
     Respond to the user, always in character based on your personality. Use
     plugins whenever you need additional information.
-    """
-DEFAULT_INSTRUCTIONS_TEMPLATE = """
+    """)
+DEFAULT_INSTRUCTIONS_TEMPLATE = condense_newlines("""
     {% if bot.name -%} 
     
     # Name
@@ -88,17 +227,11 @@ DEFAULT_INSTRUCTIONS_TEMPLATE = """
     personality is: {{ bot.personality }}
     
     {% endif -%}
-    
-    {% if bot.include_date_in_prompt -%}
-    
-    # Date
-    
-    Your training ended in the past. Today is {{ pendulum.now().format("dddd, MMMM D, YYYY at HH:mm ZZ") }}.
-    
-    {% endif -%}
-    """  # noqa: E501
+    """)  # noqa: E501
 
-PLUGIN_INSTRUCTIONS = condense_newlines("""
+DATE_INSTRUCTIONS = "# Date\n\nYour training ended in the past. Today is {date}."
+
+PLUGIN_INSTRUCTIONS = jinja_env.from_string(condense_newlines("""
     # Plugins
 
     You can use external plugins to access additional information and perform
@@ -150,18 +283,36 @@ PLUGIN_INSTRUCTIONS = condense_newlines("""
     
     You have access to the following plugins:
     
-    {% for plugin in bot.plugins -%} 
-    
-    - {{ plugin.get_full_description() }}
-    
-    {% endfor -%}
-""")  # noqa: E501
+    {{ plugin_descriptions }}
+"""))  # noqa: E501
+
+
+@functools.lru_cache
+def _load_default_plugins() -> tuple[Plugin, ...]:
+    return (
+        marvin.plugins.web.VisitURL(),
+        marvin.plugins.duckduckgo.DuckDuckGo(),
+        marvin.plugins.mathematics.Calculator(),
+    )
+
+
+def get_default_plugins() -> list[Plugin]:
+    """
+    The default plugins for bots. They are created the first time they are
+    requested and shared afterwards. Note that the bots in `marvin.bots` use
+    them, so they are created when `marvin` is imported.
+    """
+    return list(_load_default_plugins())
+
 
-DEFAULT_PLUGINS = [
-    marvin.plugins.web.VisitURL(),
-    marvin.plugins.duckduckgo.DuckDuckGo(),
-    marvin.plugins.mathematics.Calculator(),
-]
+# text fields whose newlines are condensed
+CONDENSED_FIELDS = (
+    "name",
+    "description",
+    "personality",
+    "instructions",
+    "instructions_template",
+)
 
 
 class Bot(MarvinBaseModel, LoggerMixin):
@@ -169,24 +320,31 @@ class Bot(MarvinBaseModel, LoggerMixin):
         validate_assignment = True
 
     id: BotID = Field(default_factory=BotID.new)
-    name: str = Field(None, description='The name of the bot. Defaults to "Marvin".')
+    name: str = Field(
+        DEFAULT_NAME, description='The name of the bot. Defaults to "Marvin".'
+    )
     description: str = Field(
-        None,
+        DEFAULT_DESCRIPTION,
         description=(
             "A optional description of the bot. This is for documentation only and will"
             " NOT be shown to the bot."
         ),
     )
-    personality: str = Field(None, description="The bot's personality.", repr=False)
+    personality: str = Field(
+        DEFAULT_PERSONALITY, description="The bot's personality.", repr=False
+    )
     instructions: str = Field(
-        None,
+        DEFAULT_INSTRUCTIONS,
         description="Instructions for the bot to follow when responding.",
         repr=False,
     )
     plugins: list[Plugin] = Field(
-        None, description="A list of plugins that the bot can use."
+        default_factory=lambda: (
+            get_default_plugins() if marvin.settings.bot_load_default_plugins else []
+        ),
+        description="A list of plugins that the bot can use.",
     )
-    history: History = Field(None, repr=False)
+    history: History = Field(default_factory=ThreadHistory, repr=False)
     llm_model_name: str = Field(None, repr=False)
     llm_model_temperature: float = Field(None, repr=False)
 
@@ -228,55 +386,67 @@ class Bot(MarvinBaseModel, LoggerMixin):
     )
 
     instructions_template: str = Field(
-        None,
-        description="A template for the instructions that the bot will receive.",
+        DEFAULT_INSTRUCTIONS_TEMPLATE,
+        description=(
+            "A template for the instructions that the bot will receive. It is"
+            " rendered once and reused until the bot is modified; the date is"
+            " provided to the bot separately."
+        ),
         repr=False,
     )
 
-    @validator("name", always=True)
-    def handle_name(cls, v):
-        if v is None:
-            v = DEFAULT_NAME
-        return condense_newlines(v)
-
-    @validator("description", always=True)
-    def handle_description(cls, v):
-        if v is None:
-            return DEFAULT_DESCRIPTION
-        return condense_newlines(v)
-
-    @validator("personality", always=True)
-    def handle_personality(cls, v):
-        if v is None:
-            v = DEFAULT_PERSONALITY
-        return condense_newlines(v)
-
-    @validator("instructions", always=True)
-    def handle_instructions(cls, v):
-        if v is None:
-            v = DEFAULT_INSTRUCTIONS
-        return condense_newlines(v)
-
-    @validator("instructions_template", always=True)
-    def handle_instructions_template(cls, v):
-        if v is None:
-            v = DEFAULT_INSTRUCTIONS_TEMPLATE
-        return condense_newlines(v)
-
-    @validator("plugins", always=True)
-    def default_plugins(cls, v):
+    _instructions_cache: dict = PrivateAttr(default_factory=dict)
+    _loaded_plugin_ids: tuple = PrivateAttr(default=None)
+    _plugin_descriptions: str = PrivateAttr(default=None)
+    _plugins_by_name: dict[str, Plugin] = PrivateAttr(default_factory=dict)
+
+    def __setattr__(self, name, value):
+        result = super().__setattr__(name, value)
+        # any field can appear in the instructions, so invalidate them on
+        # assignment
+        if name not in self.__private_attributes__:
+            self._instructions_cache.clear()
+        return result
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # defaults don't run validators, so condense any that subclasses
+        # override here
+        for name in CONDENSED_FIELDS:
+            field = cls.__fields__[name]
+            if isinstance(field.default, str):
+                field.default = condense_newlines(field.default)
+
+    def _copy_and_set_values(self, *args, **kwargs):
+        copy = super()._copy_and_set_values(*args, **kwargs)
+        # private attributes are copied by reference and `copy(update=...)`
+        # bypasses `__setattr__`, so copies start with their own caches
+        for name in ("_instructions_cache", "_plugins_by_name"):
+            object.__setattr__(copy, name, {})
+        for name in ("_loaded_plugin_ids", "_plugin_descriptions"):
+            object.__setattr__(copy, name, None)
+        return copy
+
+    @validator(
+        "name",
+        "description",
+        "personality",
+        "instructions",
+        "instructions_template",
+        "plugins",
+        "history",
+        pre=True,
+    )
+    def default_if_none(cls, v, field):
+        # defaults don't run validators, so only explicit `None` values are
+        # handled here
         if v is None:
-            if marvin.settings.bot_load_default_plugins:
-                return DEFAULT_PLUGINS
-            else:
-                return []
+            return field.get_default()
         return v
 
-    @validator("history", always=True)
-    def default_history(cls, v):
-        if v is None:
-            return ThreadHistory()
-        return v
+    @validator(*CONDENSED_FIELDS)
+    def handle_newlines(cls, v):
+        return condense_newlines(v)
 
     @validator("response_format", pre=True, always=True)
     def response_format_to_string(cls, v):
@@ -379,18 +549,25 @@ class Bot(MarvinBaseModel, LoggerMixin):
         message = self.input_prompt.format(*args, **kwargs)
 
         # get bot instructions
-        bot_instructions = await self._get_bot_instructions(
-            response_format=response_format
-        )
+        bot_instructions = self._get_bot_instructions(response_format=response_format)
 
+        # plugins can be changed in place, so they are checked once per call
+        # rather than each time one runs
         if self.plugins:
-            plugin_instructions = await self._get_plugin_instructions()
+            plugin_instructions = self._get_plugin_instructions()
             bot_instructions += "\n\n" + plugin_instructions
+        else:
+            self._load_plugins()
 
         bot_instructions = Message(role="system", content=bot_instructions)
 
-        # load chat history
-        history = await self._get_history()
+        # OpenAI caches the longest previously-seen prompt prefix (once it
+        # exceeds 1024 tokens), so content that changes from day to day or turn
+        # to turn goes after the bot's static instructions
+        context = [bot_instructions]
+        if self.include_date_in_prompt:
+            date_instructions = self._get_date_instructions()
+            context.append(Message(role="system", content=date_instructions))
 
         # apply input transformers
         for t in self.input_transformers:
@@ -399,7 +576,11 @@ class Bot(MarvinBaseModel, LoggerMixin):
                 message = await message
         user_message = Message(role="user", name="User", content=message)
 
-        messages = [bot_instructions] + history + [user_message]
+        # add chat history directly to the messages, without an intermediate list
+        messages = context
+        async for msg in self._iter_history():
+            messages.append(msg)
+        messages.append(user_message)
 
         self.logger.debug_kv("User message", message, "bold blue")
         await self.history.add_message(user_message)
@@ -412,6 +593,55 @@ class Bot(MarvinBaseModel, LoggerMixin):
         self.logger.debug_kv("AI message", bot_response.content, "bold green")
         return bot_response
 
+    async def stream(
+        self, *args, response_format=None, **kwargs
+    ) -> AsyncIterator[BotStreamToken]:
+        """
+        Like `say`, but yields the bot's response one token at a time as the
+        LLM generates it, rather than waiting for the full completion.
+
+        Tokens from every LLM call are yielded, including plugin payloads and
+        any tokens generated after a payload before generation stopped. Each
+        token is tagged with its round, and the bot's response is the content
+        of the tokens from the last round.
+        """
+        tokens = asyncio.Queue()
+        done = object()
+        current_round = 0
+        scanner = None
+
+        def on_token_callback(buffer: list[str]):
+            nonlocal current_round, scanner
+            # each LLM call starts a new buffer
+            if len(buffer) == 1:
+                current_round += 1
+                scanner = PluginsPayloadScanner()
+            scanner.feed(buffer[-1])
+            tokens.put_nowait(
+                BotStreamToken(
+                    content=buffer[-1],
+                    round=current_round,
+                    plugins_payload=scanner.start is not None,
+                )
+            )
+
+        task = asyncio.create_task(
+            self.say(
+                *args,
+                response_format=response_format,
+                on_token_callback=on_token_callback,
+                **kwargs,
+            )
+        )
+        task.add_done_callback(lambda _: tokens.put_nowait(done))
+        try:
+            while (token := await tokens.get()) is not done:
+                yield token
+            # raise any error from the bot
+            await task
+        finally:
+            task.cancel()
+
     async def _should_exit_bot_loop(self, response: BotResponse, counter: int) -> bool:
         if counter >= marvin.settings.bot_max_iterations:
             return True
@@ -467,34 +697,52 @@ class Bot(MarvinBaseModel, LoggerMixin):
     async def _say(self, messages: list[Message], on_token_callback: Callable = None):
         counter = 1
         loop_messages = []
+        # the base messages are sent on every iteration, so translate them once
+        prepared_messages = _get_llm_utilities().prepare_messages(messages)
         while True:
             counter += 1
-            llm_response = await self._call_llm(
-                messages=messages + loop_messages,
-                on_token_callback=on_token_callback,
-            )
-            parsed_response = await self._parse_llm_response(llm_response=llm_response)
-
-            response = BotResponse(
-                name=self.name,
-                role="bot",
-                content=llm_response,
-                parsed_content=parsed_response,
-                bot_id=self.id,
-            )
-
-            # check for early exit
-            if await self._should_exit_bot_loop(response, counter):
-                return response
+            # plugins that are started while the LLM response is streaming,
+            # keyed by the payload that requested them
+            plugin_runs = {}
+            try:
+                llm_response = await self._call_llm(
+                    messages=messages + loop_messages,
+                    on_token_callback=on_token_callback,
+                    prepared_messages=prepared_messages,
+                    plugin_runs=plugin_runs,
+                )
+                parsed_response = await self._parse_llm_response(
+                    llm_response=llm_response
+                )
 
-            else:
-                # process loop instructions and get any new messages
-                loop_messages = await self._process_response(response)
+                response = BotResponse(
+                    name=self.name,
+                    role="bot",
+                    content=llm_response,
+                    parsed_content=parsed_response,
+                    bot_id=self.id,
+                )
 
-                # if no new messages, exit loop
-                if not loop_messages:
+                # check for early exit
+                if await self._should_exit_bot_loop(response, counter):
                     return response
 
+                else:
+                    # process loop instructions and get any new messages
+                    loop_messages = await self._process_response(
+                        response, plugin_runs=plugin_runs
+                    )
+
+                    # if no new messages, exit loop
+                    if not loop_messages:
+                        return response
+            finally:
+                # stop any plugins whose outputs will not be used
+                for runs in plugin_runs.values():
+                    for run in runs:
+                        if run is not None:
+                            run.cancel()
+
     async def reset_thread(self):
         await self.history.clear()
 
@@ -515,46 +763,170 @@ class Bot(MarvinBaseModel, LoggerMixin):
             )
             self.history = ThreadHistory(thread_id=thread.id)
 
-    async def _get_bot_instructions(self, response_format=None) -> str:
+    def _get_bot_instructions(self, response_format=None) -> str:
         if response_format is not None:
-            response_format = load_formatter_from_shorthand(response_format)
-        else:
-            response_format = self.response_format
+            return self._render_bot_instructions(
+                response_format=load_formatter_from_shorthand(response_format)
+            )
 
-        bot_instructions = jinja_env.from_string(self.instructions_template).render(
+        # the default template doesn't depend on the date, but custom templates
+        # might, so they are re-rendered each day
+        cache_date = None
+        if self.instructions_template != DEFAULT_INSTRUCTIONS_TEMPLATE:
+            cache_date = _today_string()
+        cached = self._instructions_cache.get("bot")
+        if cached is None or cached[0] != cache_date:
+            cached = (
+                cache_date,
+                self._render_bot_instructions(response_format=self.response_format),
+            )
+            self._instructions_cache["bot"] = cached
+        return cached[1]
+
+    def _render_bot_instructions(self, response_format: ResponseFormatter) -> str:
+        return _compile_template(self.instructions_template).render(
             bot=self, response_format=response_format
         )
 
-        return bot_instructions
+    def _get_date_instructions(self) -> str:
+        return DATE_INSTRUCTIONS.format(date=_today_string())
 
-    async def _get_plugin_instructions(self) -> str:
-        plugin_instructions = jinja_env.from_string(PLUGIN_INSTRUCTIONS).render(
-            bot=self
+    def _load_plugins(self):
+        """
+        Precompute plugin data when the bot's plugins change. Plugins can be
+        added to the list in place, so this compares the loaded plugins rather
+        than relying on assignment. It runs once per `say()`, before any plugins
+        are run.
+        """
+        plugin_ids = tuple(id(p) for p in self.plugins)
+        if plugin_ids == self._loaded_plugin_ids:
+            return
+        self._plugin_descriptions = "\n\n".join(
+            f"- {p.get_full_description()}" for p in self.plugins
         )
-        return plugin_instructions
+        # reversed so that the first plugin with a given name takes precedence
+        self._plugins_by_name = {p.name: p for p in reversed(self.plugins)}
+        self._loaded_plugin_ids = plugin_ids
+        self._instructions_cache.pop("plugins", None)
+
+    def _get_plugin_instructions(self) -> str:
+        self._load_plugins()
+        if "plugins" not in self._instructions_cache:
+            self._instructions_cache["plugins"] = PLUGIN_INSTRUCTIONS.render(
+                plugin_descriptions=self._plugin_descriptions
+            )
+        return self._instructions_cache["plugins"]
 
-    async def _get_history(self) -> list[Message]:
-        history = await self.history.get_messages(
+    async def _iter_history(self) -> AsyncIterator[Message]:
+        async for msg in self.history.iter_messages(
             max_tokens=3500 - marvin.settings.openai_model_max_tokens
-        )
-        return history
+        ):
+            yield msg
 
     async def _call_llm(
-        self, messages: list[Message], on_token_callback: Callable = None
+        self,
+        messages: list[Message],
+        on_token_callback: Callable = None,
+        prepared_messages: list = None,
+        plugin_runs: dict = None,
     ) -> str:
         """
-        Get an LLM response to a history of Marvin messages via langchain
+        Get an LLM response to a history of Marvin messages, reusing a cached
+        response to a similar conversation if the semantic cache is enabled and
+        the final message is from the user.
+
+        `prepared_messages` may contain the langchain translations of a prefix
+        of `messages`, in which case only the remaining messages are translated.
+        If `plugin_runs` is provided, plugins are started as soon as a plugins
+        payload has been generated; see `_generate`.
         """
+        # only responses to user messages are cached; later rounds of the
+        # plugins loop depend on the exact plugin outputs
+        if not marvin.settings.bot_semantic_cache or messages[-1].role != "user":
+            return await self._generate(
+                messages=messages,
+                on_token_callback=on_token_callback,
+                prepared_messages=prepared_messages,
+                plugin_runs=plugin_runs,
+            )
 
         # deferred import for performance
+        from marvin.utilities.cache import embed_text, get_semantic_cache
+
+        # only conversations with identical context can share a response; the
+        # final message is compared by meaning
+        cache = get_semantic_cache()
+        cache_namespace = hash_text(
+            self.llm_model_name or marvin.settings.openai_model_name,
+            *(f"{m.role}: {m.content}" for m in messages[:-1]),
+        )
+        cache_key = await run_async(embed_text, messages[-1].content)
+        llm_response = cache.lookup(
+            cache_key,
+            threshold=marvin.settings.bot_semantic_cache_threshold,
+            namespace=cache_namespace,
+        )
+        if llm_response is not None:
+            self.logger.debug_kv("Using cached LLM response", llm_response)
+            if on_token_callback is not None:
+                output = on_token_callback([llm_response])
+                if inspect.iscoroutine(output):
+                    await output
+            return llm_response
 
-        import marvin.utilities.llms
+        llm_response = await self._generate(
+            messages=messages,
+            on_token_callback=on_token_callback,
+            prepared_messages=prepared_messages,
+            plugin_runs=plugin_runs,
+        )
+        cache.add(cache_key, llm_response, namespace=cache_namespace)
+        return llm_response
+
+    async def _generate(
+        self,
+        messages: list[Message],
+        on_token_callback: Callable = None,
+        prepared_messages: list = None,
+        plugin_runs: dict = None,
+    ) -> str:
+        """
+        Get an LLM response to a history of Marvin messages via langchain
+
+        If `plugin_runs` is provided, the plugins requested by the response's
+        plugins payload are started as soon as the payload is complete, and
+        their tasks are stored in `plugin_runs` under the payload.
+        """
+
+        llms = _get_llm_utilities()
+        prepared_messages = prepared_messages or []
+        langchain_messages = prepared_messages + llms.prepare_messages(
+            messages[len(prepared_messages) :]
+        )
 
-        langchain_messages = marvin.utilities.llms.prepare_messages(messages)
-        llm = marvin.utilities.llms.get_llm(
+        # if the bot has plugins, stream the response so generation can be
+        # stopped as soon as a complete plugins payload has been received,
+        # rather than paying for any tokens the model produces after it
+        scanner = None
+        token_callback = on_token_callback
+        if self.plugins:
+            scanner = PluginsPayloadScanner()
+            payload_received = asyncio.Event()
+
+            async def token_callback(buffer: list[str]):
+                if on_token_callback is not None:
+                    output = on_token_callback(buffer)
+                    if inspect.iscoroutine(output):
+                        await output
+                if scanner.feed(buffer[-1]) and not payload_received.is_set():
+                    payload_received.set()
+                    if plugin_runs is not None:
+                        self._start_plugins(scanner.payload, plugin_runs)
+
+        llm = llms.get_llm(
             model_name=self.llm_model_name,
             temperature=self.llm_model_temperature,
-            on_token_callback=on_token_callback,
+            on_token_callback=token_callback,
         )
 
         if marvin.settings.verbose:
@@ -563,9 +935,25 @@ class Bot(MarvinBaseModel, LoggerMixin):
                 "Sending messages to LLM", messages_repr, key_style="green"
             )
         try:
-            result = await llm.agenerate(
-                messages=[langchain_messages], stop=["</stop>"]
+            generation = asyncio.ensure_future(
+                llm.agenerate(messages=[langchain_messages], stop=["</stop>"])
             )
+            if scanner is not None:
+                payload_wait = asyncio.ensure_future(payload_received.wait())
+                try:
+                    await asyncio.wait(
+                        [generation, payload_wait],
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                finally:
+                    payload_wait.cancel()
+                    stopped_early = not generation.done()
+                    if stopped_early:
+                        generation.cancel()
+                if stopped_early:
+                    self.logger.debug("Stopped generation after plugins payload")
+                    return scanner.text[: scanner.end]
+            result = await generation
         except InvalidRequestError as exc:
             if "does not exist" in str(exc):
                 raise ValueError(
@@ -627,18 +1015,29 @@ class Bot(MarvinBaseModel, LoggerMixin):
         """
         return as_sync_fn(cls.reset_thread)(*args, **kwargs)
 
-    async def _process_response(self, response: BotResponse) -> list[Message]:
+    async def _process_response(
+        self, response: BotResponse, plugin_runs: dict = None
+    ) -> list[Message]:
+        """
+        Run the plugins requested by a response and return the messages to send
+        back to the LLM. Plugins that were already started for a payload are
+        taken from `plugin_runs` instead of being run again.
+        """
+        plugin_runs = plugin_runs if plugin_runs is not None else {}
         new_messages = []
-        if match := PLUGINS_REGEX.search(response.content):
+        if plugins_payload := find_plugins_payload(response.content):
             try:
-                payload = json.loads(match.group(1))
+                payload = json.loads(plugins_payload)
                 new_messages.append(Message(role="bot", content=response.content))
                 self.logger.debug_kv("Plugins payload", payload)
 
                 plugins = payload.get("plugins", [])
-                plugin_outputs = await asyncio.gather(
-                    *[self._run_plugin(p["name"], p["inputs"]) for p in plugins]
-                )
+                started = plugin_runs.get(plugins_payload) or [None] * len(plugins)
+                runs = [
+                    self._run_plugin(p["name"], p["inputs"]) if run is None else run
+                    for p, run in zip(plugins, started)
+                ]
+                plugin_outputs = await asyncio.gather(*runs)
 
                 new_messages.append(
                     Message(
@@ -668,8 +1067,45 @@ class Bot(MarvinBaseModel, LoggerMixin):
 
         return new_messages
 
+    def _start_plugins(self, plugins_payload: str, plugin_runs: dict):
+        """
+        Start the speculative plugins requested by a plugins payload in the
+        background and store their tasks in `plugin_runs`, so they can run
+        while the rest of the LLM response is handled. Other plugins are stored
+        as None and run when the response is processed, as are all plugins of
+        an invalid payload.
+        """
+        try:
+            payload = json.loads(plugins_payload)
+            plugins = [
+                (self._get_plugin(p["name"]), p["name"], p["inputs"])
+                for p in payload.get("plugins", [])
+            ]
+        except Exception:
+            return
+        plugin_runs[plugins_payload] = [
+            (
+                asyncio.ensure_future(self._run_plugin(name, inputs))
+                if plugin is not None and plugin.speculative
+                else None
+            )
+            for plugin, name, inputs in plugins
+        ]
+
+    def _get_plugin(self, plugin_name: str) -> Optional[Plugin]:
+        """
+        Look up a plugin by name. The plugins are loaded by `say()`, so on a
+        miss they are reloaded in case they were never loaded or have changed.
+        """
+        plugin_name = plugin_name.strip()
+        plugin = self._plugins_by_name.get(plugin_name)
+        if plugin is None:
+            self._load_plugins()
+            plugin = self._plugins_by_name.get(plugin_name)
+        return plugin
+
     async def _run_plugin(self, plugin_name: str, plugin_inputs: dict) -> str:
-        plugin = next((p for p in self.plugins if p.name == plugin_name.strip()), None)
+        plugin = self._get_plugin(plugin_name)
         if plugin is None:
             return f'Plugin "{plugin_name}" not found.'
         try:
@@ -1,6 +1,7 @@
 import abc
+from typing import AsyncIterator, Iterable
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 import marvin
 from marvin.models.ids import ThreadID
@@ -18,28 +19,50 @@ class History(DiscriminatedUnionType, abc.ABC):
     async def _load_messages(self, n: int = None) -> list[Message]:
         raise NotImplementedError()
 
-    async def get_messages(
+    async def iter_messages(
         self, n: int = None, max_tokens: int = None
+    ) -> AsyncIterator[Message]:
+        """
+        Yield messages in chronological order. If `max_tokens` is provided,
+        only the most recent messages that fit within it are yielded.
+        """
+        if max_tokens is not None:
+            messages = await self.tail_by_tokens(max_tokens=max_tokens, n=n)
+        else:
+            messages = sorted(await self._load_messages(n=n), key=lambda m: m.timestamp)
+        for msg in messages:
+            yield msg
+
+    async def tail_by_tokens(self, max_tokens: int, n: int = None) -> list[Message]:
+        """
+        Return the most recent messages whose combined token count fits within
+        `max_tokens`, in chronological order.
+        """
+        messages = sorted(await self._load_messages(n=n), key=lambda m: m.timestamp)
+        return self._take_tail(reversed(messages), max_tokens=max_tokens)
+
+    def _take_tail(
+        self, newest_first: Iterable[Message], max_tokens: int
     ) -> list[Message]:
-        messages = await self._load_messages(n=n)
-
-        # sort in reverse timestamp order
-        messages = sorted(messages, key=lambda m: m.timestamp, reverse=True)
+        # walk back from the most recent message until the budget is spent, so
+        # older messages are never tokenized
+        tail = []
+        total_tokens = 0
+        for msg in newest_first:
+            total_tokens += self._count_tokens(msg)
+            if total_tokens > max_tokens:
+                break
+            tail.append(msg)
+        tail.reverse()
+        return tail
+
+    def _count_tokens(self, message: Message) -> int:
+        return count_tokens(message.content)
 
-        if max_tokens is None:
-            final_messages = messages
-        else:
-            total_tokens = 0
-            final_messages = []
-            for msg in messages:
-                msg_tokens = count_tokens(msg.content)
-                if total_tokens + msg_tokens > max_tokens:
-                    break
-                else:
-                    final_messages.append(msg)
-                    total_tokens += msg_tokens
-
-        return list(reversed(final_messages))
+    async def get_messages(
+        self, n: int = None, max_tokens: int = None
+    ) -> list[Message]:
+        return [msg async for msg in self.iter_messages(n=n, max_tokens=max_tokens)]
 
     @abc.abstractmethod
     async def clear(self):
@@ -81,10 +104,15 @@ class InMemoryHistory(History):
             " recent message. Set to None to store all messages."
         ),
     )
+    # token counts of stored messages, by message ID
+    _token_counts: dict = PrivateAttr(default_factory=dict)
 
     async def add_message(self, message: Message):
         self.messages.append(message)
+        self._token_counts[message.id] = count_tokens(message.content)
         if self.max_messages is not None:
+            for evicted in self.messages[: -self.max_messages]:
+                self._token_counts.pop(evicted.id, None)
             self.messages = self.messages[-self.max_messages :]
 
     async def _load_messages(self, n: int = None) -> list[Message]:
@@ -92,5 +120,17 @@ class InMemoryHistory(History):
             return self.messages.copy()
         return self.messages[-n:]
 
+    async def tail_by_tokens(self, max_tokens: int, n: int = None) -> list[Message]:
+        # messages are stored in the order they were added, so only the
+        # returned messages are visited
+        messages = self.messages if n is None else self.messages[-n:]
+        return self._take_tail(reversed(messages), max_tokens=max_tokens)
+
+    def _count_tokens(self, message: Message) -> int:
+        if message.id not in self._token_counts:
+            self._token_counts[message.id] = super()._count_tokens(message)
+        return self._token_counts[message.id]
+
     async def clear(self):
         self.messages.clear()
+        self._token_counts.clear()
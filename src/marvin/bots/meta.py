@@ -1,6 +1,6 @@
 import marvin
 from marvin import Bot, plugin
-from marvin.bot.base import DEFAULT_PLUGINS
+from marvin.bot.base import get_default_plugins
 
 
 @plugin
@@ -121,6 +121,6 @@ marvin_bot = Bot(
         create_bot,
         update_bot,
         delete_bot,
-        *DEFAULT_PLUGINS,
+        *get_default_plugins(),
     ],
 )
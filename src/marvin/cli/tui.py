@@ -31,7 +31,7 @@ from textual.widgets import (
 from textual.widgets.option_list import Option
 
 import marvin
-from marvin.bot.base import PLUGINS_REGEX
+from marvin.bot.base import find_plugins_payload
 from marvin.config import ENV_FILE
 from marvin.models.ids import MessageID, ThreadID
 from marvin.utilities.strings import jinja_env
@@ -667,8 +667,8 @@ class MainScreen(Screen):
             else:
                 user_update = "Engaging autopilot..."
             try:
-                if plugins_match := PLUGINS_REGEX.search(streaming_response):
-                    payload = json.loads(plugins_match.group(1))
+                if plugins_payload := find_plugins_payload(streaming_response):
+                    payload = json.loads(plugins_payload)
                     user_update = payload.get("user_update", user_update)
                     template = inspect.cleandoc("""
                         {{ user_update }}
@@ -141,6 +141,28 @@ class Settings(BaseSettings):
             "If True, bots will load a default set of plugins if none are provided."
         ),
     )
+    bot_semantic_cache: bool = Field(
+        False,
+        description=(
+            "If True, bots will reuse LLM responses for conversations whose context"
+            " is identical and whose final message is semantically similar."
+            " Requires `sentence-transformers`."
+        ),
+    )
+    bot_semantic_cache_threshold: float = Field(
+        0.92,
+        description=(
+            "The minimum cosine similarity between final messages for a cached"
+            " response to be reused."
+        ),
+    )
+    bot_semantic_cache_ttl: float = Field(
+        3600, description="The number of seconds cached responses remain valid."
+    )
+    bot_semantic_cache_model: str = Field(
+        "all-MiniLM-L6-v2",
+        description="The sentence-transformers model used to embed messages.",
+    )
 
     # SLACK
     slack_bot_name: str = Field(
@@ -1,6 +1,6 @@
 import inspect
 from functools import partial
-from typing import Callable
+from typing import Callable, ClassVar
 
 from pydantic import Field, PrivateAttr, validator
 
@@ -18,6 +18,10 @@ class Plugin(DiscriminatedUnionType):
         ),
         repr=False,
     )
+    # if True, the plugin may be run as soon as the bot requests it, before the
+    # bot has decided to use its output. Only enable this for plugins without
+    # side effects.
+    speculative: ClassVar[bool] = False
     _signature: str = PrivateAttr()
 
     def __repr__(self):
@@ -49,10 +53,7 @@ class Plugin(DiscriminatedUnionType):
         description = safe_format(self.description, **self.dict()).strip()
         docstring = self.run.__doc__
 
-        result = inspect.cleandoc(f"""
-            Name: {self.name}
-            Signature: {self._signature}
-            """)
+        result = f"Name: {self.name}\nSignature: {self._signature}"
         if description:
             result += f"\n{description}"
         if docstring:
@@ -1,4 +1,5 @@
 import asyncio
+from typing import ClassVar
 
 import httpx
 from duckduckgo_search import ddg, ddg_answers
@@ -47,6 +48,7 @@ class DuckDuckGo(Plugin):
         " the answer, you don't need to use this unless asked to. Works best with"
         " simple, discrete queries for one question at a time."
     )
+    speculative: ClassVar[bool] = True
 
     async def run(self, query: str) -> str:
         return await search_ddg(query)
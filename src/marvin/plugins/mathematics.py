@@ -2,6 +2,7 @@ import ast
 import math
 import operator
 import random
+from typing import ClassVar
 
 from simpleeval import SimpleEval, safe_power
 
@@ -34,6 +35,7 @@ class Calculator(Plugin):
         f" numbers, and the functions {', '.join(math_functions)}; not strings or"
         " units."
     )
+    speculative: ClassVar[bool] = True
 
     async def run(self, expression: str) -> str:
         return _calculator.eval(expression)
@@ -1,4 +1,5 @@
 import json
+from typing import ClassVar
 
 import httpx
 from fastapi import status
@@ -15,6 +16,7 @@ class VisitURL(Plugin):
         "Visit a URL and return its contents. Don't provide a URL unless you're"
         " absolutely sure it exists."
     )
+    speculative: ClassVar[bool] = True
 
     async def run(self, url: str) -> str:
         if not url.startswith("http"):
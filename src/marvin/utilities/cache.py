@@ -0,0 +1,114 @@
+import time
+from functools import lru_cache
+from typing import Any, Optional
+
+import numpy as np
+
+import marvin
+
+
+class SemanticCache:
+    """
+    An in-memory cache that is keyed by embedding vectors. A lookup returns the
+    value of the most similar stored key, as long as its cosine similarity to
+    the query meets a threshold.
+
+    Keys are normalized when they are added and stored as rows of a single
+    matrix, so each lookup is one matrix-vector product. Entries can optionally
+    be grouped into namespaces, in which case a lookup only matches entries from
+    the same namespace.
+    """
+
+    def __init__(
+        self, threshold: float = 0.92, ttl: float = None, max_size: int = 1000
+    ):
+        """
+        Args:
+            - threshold: The minimum cosine similarity for a lookup to match.
+            - ttl: The number of seconds entries remain valid. If None, entries
+              do not expire.
+            - max_size: The maximum number of entries. The oldest entries are
+              evicted first.
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def clear(self):
+        self._keys = np.empty((0, 0), dtype=np.float32)
+        self._namespaces = np.empty(0, dtype=object)
+        self._timestamps = np.empty(0, dtype=np.float64)
+        self._values: list[Any] = []
+
+    def add(self, key: np.ndarray, value: Any, namespace: str = None):
+        key = _normalize(key)
+        # evict the oldest entries to make room
+        start = max(len(self._values) + 1 - self.max_size, 0)
+        if self._values:
+            keys = self._keys[start:]
+        else:
+            keys = np.empty((0, key.size), dtype=np.float32)
+        self._keys = np.vstack([keys, key])
+        self._namespaces = np.append(
+            self._namespaces[start:], np.array([namespace], dtype=object)
+        )
+        self._timestamps = np.append(self._timestamps[start:], time.monotonic())
+        self._values = self._values[start:] + [value]
+
+    def lookup(
+        self, key: np.ndarray, threshold: float = None, namespace: str = None
+    ) -> Optional[Any]:
+        if not self._values:
+            return None
+        if threshold is None:
+            threshold = self.threshold
+
+        similarities = self._keys @ _normalize(key)
+        similarities[self._namespaces != namespace] = -np.inf
+        if self.ttl is not None:
+            expired = self._timestamps <= time.monotonic() - self.ttl
+            similarities[expired] = -np.inf
+
+        best = int(np.argmax(similarities))
+        if similarities[best] >= threshold:
+            return self._values[best]
+        return None
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@lru_cache
+def _get_embedding_model(model_name: str):
+    try:
+        # deferred import for performance
+        from sentence_transformers import SentenceTransformer
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError(
+            "The semantic cache requires `sentence-transformers`. Install it with"
+            " `pip install marvin[cache]` or disable the cache by setting"
+            " `MARVIN_BOT_SEMANTIC_CACHE=false`."
+        )
+    return SentenceTransformer(model_name)
+
+
+def embed_text(text: str) -> np.ndarray:
+    """
+    Embed text with the local model configured by
+    `marvin.settings.bot_semantic_cache_model`.
+    """
+    model = _get_embedding_model(marvin.settings.bot_semantic_cache_model)
+    return model.encode(text)
+
+
+@lru_cache
+def get_semantic_cache() -> SemanticCache:
+    """The process-wide cache of bot responses."""
+    return SemanticCache(ttl=marvin.settings.bot_semantic_cache_ttl)
@@ -79,18 +79,18 @@ def get_llm(
     )
 
 
+ROLE_MESSAGE_TYPES = {
+    "system": SystemMessage,
+    "bot": AIMessage,
+    "user": HumanMessage,
+}
+
+
 def prepare_messages(
     messages: list[Message],
-) -> Union[AIMessage, HumanMessage, SystemMessage]:
+) -> list[Union[AIMessage, HumanMessage, SystemMessage]]:
     """Prepare messages for LLM."""
-    langchain_messages = []
-    for msg in messages:
-        if msg.role == "system":
-            langchain_messages.append(SystemMessage(content=msg.content))
-        elif msg.role == "bot":
-            langchain_messages.append(AIMessage(content=msg.content))
-        elif msg.role == "user":
-            langchain_messages.append(HumanMessage(content=msg.content))
-        else:
-            raise ValueError(f"Unrecognized role: {msg.role}")
-    return langchain_messages
+    try:
+        return [ROLE_MESSAGE_TYPES[msg.role](content=msg.content) for msg in messages]
+    except KeyError as exc:
+        raise ValueError(f"Unrecognized role: {exc.args[0]}")
@@ -66,16 +66,22 @@ def hash_text(*text: str) -> str:
 
 
 VERSION_NUMBERS = re.compile(r"\b\d+\.\d+(?:\.\d+)?\w*\b")
+HTML_COMMENTS = re.compile(r"<!--.*?-->", re.DOTALL)
+FORMAT_FIELDS = re.compile(r"{([^{}]*)}")
+MD_LINKS = re.compile(r"\[(?P<text>[^\]]+)]\((?P<url>[^\)]+)\)")
+
+
+@lru_cache
+def _get_tokenizer() -> tiktoken.Encoding:
+    return tiktoken.encoding_for_model("gpt-3.5-turbo")
 
 
 def tokenize(text: str) -> list[int]:
-    tokenizer = tiktoken.encoding_for_model("gpt-3.5-turbo")
-    return tokenizer.encode(text)
+    return _get_tokenizer().encode(text)
 
 
 def detokenize(tokens: list[int]) -> str:
-    tokenizer = tiktoken.encoding_for_model("gpt-3.5-turbo")
-    return tokenizer.decode(tokens)
+    return _get_tokenizer().decode(tokens)
 
 
 def count_tokens(text: str) -> int:
@@ -243,7 +249,7 @@ def html_to_content(html: str) -> str:
 
 
 def rm_html_comments(text: str) -> str:
-    return re.sub(r"<!--.*?-->", "", text, flags=re.DOTALL)
+    return HTML_COMMENTS.sub("", text)
 
 
 def rm_text_after(text: str, substring: str) -> str:
@@ -262,18 +268,15 @@ def safe_format(text, **kwargs):
         else:
             return match.group(0)
 
-    pattern = re.compile(r"{([^{}]*)}")
-    return pattern.sub(repl, text)
+    return FORMAT_FIELDS.sub(repl, text)
 
 
 def convert_md_links_to_slack(text):
-    md_link_pattern = r"\[(?P<text>[^\]]+)]\((?P<url>[^\)]+)\)"
-
     # converting Markdown links to Slack-style links
     def to_slack_link(match):
         return f'<{match.group("url")}|{match.group("text")}>'
 
     # Replace Markdown links with Slack-style links
-    slack_text = re.sub(md_link_pattern, to_slack_link, text)
+    slack_text = MD_LINKS.sub(to_slack_link, text)
 
     return slack_text
@@ -1,10 +1,16 @@
+import asyncio
 import inspect
 
 import marvin
+import numpy as np
 import pydantic
 import pytest
+from langchain.schema import AIMessage, ChatGeneration, LLMResult
 from marvin import Bot
+from marvin.bot.history import InMemoryHistory
 from marvin.bot.response_formatters import ResponseFormatter
+from marvin.models.threads import Message
+from marvin.utilities.cache import SemanticCache
 from marvin.utilities.strings import condense_newlines
 from marvin.utilities.types import format_type_str
 
@@ -44,6 +50,54 @@ class TestCreateBots:
         assert bot.personality == condense_newlines(marvin.bot.base.DEFAULT_PERSONALITY)
         assert bot.instructions == "Test Instructions"
 
+    def test_subclass_defaults_are_condensed(self):
+        class CustomBot(Bot):
+            personality: str = """
+                A custom
+                personality
+                """
+
+        assert CustomBot().personality == "A custom personality"
+
+
+class TestBotInstructions:
+    def test_instructions_are_updated_on_assignment(self):
+        bot = Bot(personality="A cheerful robot")
+        assert "A cheerful robot" in bot._get_bot_instructions()
+
+        bot.personality = "A paranoid android"
+        instructions = bot._get_bot_instructions()
+        assert "A paranoid android" in instructions
+        assert "A cheerful robot" not in instructions
+
+    def test_plugin_instructions_are_updated_when_plugins_change(self):
+        bot = Bot(plugins=[marvin.plugins.mathematics.Calculator()])
+        assert "visit-url" not in bot._get_plugin_instructions()
+
+        bot.plugins.append(marvin.plugins.web.VisitURL())
+        assert "visit-url" in bot._get_plugin_instructions()
+
+    def test_custom_templates_are_rendered_daily(self, monkeypatch):
+        today = "Monday"
+        monkeypatch.setattr(marvin.bot.base, "_today_string", lambda: today)
+        default_bot = Bot()
+        custom_bot = Bot(instructions_template=custom_instructions_template)
+        default_instructions = default_bot._get_bot_instructions()
+        custom_instructions = custom_bot._get_bot_instructions()
+        assert custom_bot._get_bot_instructions() is custom_instructions
+
+        today = "Tuesday"
+        assert default_bot._get_bot_instructions() is default_instructions
+        assert custom_bot._get_bot_instructions() is not custom_instructions
+
+    def test_copies_do_not_share_cached_instructions(self):
+        bot = Bot(personality="A cheerful robot")
+        assert "A cheerful robot" in bot._get_bot_instructions()
+
+        copy = bot.copy(update={"personality": "A paranoid android"})
+        assert "A paranoid android" in copy._get_bot_instructions()
+        assert "A cheerful robot" in bot._get_bot_instructions()
+
 
 class TestSaveBots:
     async def test_save_bot(self):
@@ -208,3 +262,220 @@ class TestResponseFormat:
             "A JSON object that satisfies the following OpenAPI schema:"
         )
         assert str(OutputFormat.schema_json()) in bot.response_format.format
+
+
+class TestFindPluginsPayload:
+    def test_no_payload(self):
+        assert marvin.bot.base.find_plugins_payload("Hello {world}") is None
+
+    def test_payload_excludes_trailing_text(self):
+        payload = '{"mode": "plugins", "plugins": [{"id": 1}]}'
+        text = f"Let me check.\n\n{payload}\n\nAnything else? }}"
+        assert marvin.bot.base.find_plugins_payload(text) == payload
+
+    def test_braces_and_quotes_inside_strings(self):
+        payload = '{"mode": "plugins", "objective": "a } with \\" and {"}'
+        assert marvin.bot.base.find_plugins_payload(payload + "}") == payload
+
+    def test_unterminated_payload(self):
+        text = '{"mode": "plugins", "plugins": ['
+        assert marvin.bot.base.find_plugins_payload(text) == text
+
+    def test_scanner_detects_payload_across_chunks(self):
+        scanner = marvin.bot.base.PluginsPayloadScanner()
+        chunks = ["I'll check. {", '"mode": ', '"plugins", "x": "}', '"}', " more"]
+        assert [scanner.feed(c) for c in chunks] == [False, False, False, True, True]
+        assert scanner.payload == '{"mode": "plugins", "x": "}"}'
+
+
+class TestProcessResponse:
+    payload = '{"mode": "plugins", "plugins": [{"name": "record", "inputs": {"x": 1}}]}'
+
+    def get_bot(self, calls: list, speculative: bool) -> Bot:
+        @marvin.plugin
+        def record(x: int) -> str:
+            calls.append(x)
+            return f"recorded {x}"
+
+        type(record).speculative = speculative
+        return Bot(plugins=[record])
+
+    async def test_started_plugins_are_not_run_again(self):
+        calls = []
+        bot = self.get_bot(calls, speculative=True)
+        plugin_runs = {}
+        bot._start_plugins(self.payload, plugin_runs)
+        await asyncio.gather(*plugin_runs[self.payload])
+        assert calls == [1]
+
+        response = marvin.bot.base.BotResponse(role="bot", content=self.payload)
+        messages = await bot._process_response(response, plugin_runs=plugin_runs)
+        assert calls == [1]
+        assert "recorded 1" in messages[-1].content
+
+    async def test_only_speculative_plugins_are_started(self):
+        calls = []
+        bot = self.get_bot(calls, speculative=False)
+        plugin_runs = {}
+        bot._start_plugins(self.payload, plugin_runs)
+        assert plugin_runs[self.payload] == [None]
+        assert calls == []
+
+        response = marvin.bot.base.BotResponse(role="bot", content=self.payload)
+        messages = await bot._process_response(response, plugin_runs=plugin_runs)
+        assert calls == [1]
+        assert "recorded 1" in messages[-1].content
+
+    async def test_plugins_are_found_without_loading(self):
+        calls = []
+        bot = self.get_bot(calls, speculative=False)
+        assert await bot.copy()._run_plugin("record", {"x": 2}) == "recorded 2"
+        assert await bot._run_plugin("record", {"x": 3}) == "recorded 3"
+        assert calls == [2, 3]
+
+
+class FakeStreamingLLM:
+    """
+    Streams tokens to its token callback, then either returns them or, if
+    `wait_for_cancel` is True, waits until it is cancelled.
+    """
+
+    def __init__(
+        self,
+        tokens: list[str],
+        on_token_callback=None,
+        wait_for_cancel: bool = False,
+    ):
+        self.tokens = tokens
+        self.on_token_callback = on_token_callback
+        self.wait_for_cancel = wait_for_cancel
+        self.task = None
+
+    async def agenerate(self, messages, stop=None):
+        self.task = asyncio.current_task()
+        buffer = []
+        for token in self.tokens:
+            buffer.append(token)
+            await self.on_token_callback(buffer)
+            await asyncio.sleep(0)
+        if self.wait_for_cancel:
+            await asyncio.Event().wait()
+        message = AIMessage(content="".join(self.tokens))
+        return LLMResult(generations=[[ChatGeneration(message=message)]])
+
+
+class TestGenerate:
+    async def test_generation_stops_after_plugins_payload(self, monkeypatch):
+        payload = '{"mode": "plugins", "plugins": []}'
+        tokens = ["Let me check. ", payload[:10], payload[10:], " more"]
+        llms = []
+
+        def get_llm(on_token_callback=None, **kwargs):
+            llms.append(
+                FakeStreamingLLM(tokens, on_token_callback, wait_for_cancel=True)
+            )
+            return llms[-1]
+
+        monkeypatch.setattr("marvin.utilities.llms.get_llm", get_llm)
+
+        bot = Bot(plugins=[marvin.plugins.mathematics.Calculator()])
+        response = await bot._generate(messages=[Message(role="user", content="hi")])
+        assert response == f"Let me check. {payload}"
+
+        await asyncio.gather(llms[0].task, return_exceptions=True)
+        assert llms[0].task.cancelled()
+
+
+class TestStream:
+    async def test_stream_tags_tokens_with_their_round(self, monkeypatch):
+        payload = (
+            '{"mode": "plugins", "plugins": [{"name": "calculator", "inputs":'
+            ' {"expression": "1 + 1"}}]}'
+        )
+        rounds = iter(
+            [
+                ([payload[:20], payload[20:]], True),
+                (["The answer ", "is 2."], False),
+            ]
+        )
+
+        def get_llm(on_token_callback=None, **kwargs):
+            tokens, wait_for_cancel = next(rounds)
+            return FakeStreamingLLM(tokens, on_token_callback, wait_for_cancel)
+
+        monkeypatch.setattr("marvin.utilities.llms.get_llm", get_llm)
+
+        bot = Bot(
+            plugins=[marvin.plugins.mathematics.Calculator()],
+            history=InMemoryHistory(),
+            include_date_in_prompt=False,
+        )
+        tokens = [token async for token in bot.stream("What is 1 + 1?")]
+
+        assert [t.content for t in tokens if t.round == 1] == [
+            payload[:20],
+            payload[20:],
+        ]
+        assert all(t.plugins_payload for t in tokens if t.round == 1)
+        assert [t.content for t in tokens if t.round == 2] == ["The answer ", "is 2."]
+        assert not any(t.plugins_payload for t in tokens if t.round == 2)
+
+        history = await bot.history.get_messages()
+        assert history[-1].content == "The answer is 2."
+
+
+class TestCallLLM:
+    @pytest.fixture(autouse=True)
+    def generate(self, monkeypatch):
+        calls = []
+
+        async def _generate(self, messages, **kwargs):
+            calls.append(messages)
+            return f"response {len(calls)}"
+
+        monkeypatch.setattr(Bot, "_generate", _generate)
+        return calls
+
+    @pytest.fixture(autouse=True)
+    def semantic_cache(self, monkeypatch):
+        embeddings = {
+            "What is 2 + 2?": [1.0, 0.0],
+            "what's 2+2?": [0.99, 0.1],
+            "Plugin output": [0.0, 1.0],
+        }
+        cache = SemanticCache()
+        monkeypatch.setattr("marvin.utilities.cache.get_semantic_cache", lambda: cache)
+        monkeypatch.setattr(
+            "marvin.utilities.cache.embed_text",
+            lambda text: np.array(embeddings[text]),
+        )
+        return cache
+
+    async def test_cache_disabled(self, generate):
+        bot = Bot()
+        messages = [Message(role="user", content="What is 2 + 2?")]
+        with marvin.config.temporary_settings(bot_semantic_cache=False):
+            assert await bot._call_llm(messages) == "response 1"
+            assert await bot._call_llm(messages) == "response 2"
+        assert len(generate) == 2
+
+    async def test_cache_reuses_response_to_similar_message(self, generate):
+        bot = Bot()
+        with marvin.config.temporary_settings(bot_semantic_cache=True):
+            first = [Message(role="user", content="What is 2 + 2?")]
+            second = [Message(role="user", content="what's 2+2?")]
+            assert await bot._call_llm(first) == "response 1"
+            assert await bot._call_llm(second) == "response 1"
+        assert len(generate) == 1
+
+    async def test_cache_skips_plugin_outputs(self, generate, semantic_cache):
+        bot = Bot()
+        messages = [
+            Message(role="user", content="What is 2 + 2?"),
+            Message(role="system", content="Plugin output"),
+        ]
+        with marvin.config.temporary_settings(bot_semantic_cache=True):
+            assert await bot._call_llm(messages) == "response 1"
+            assert await bot._call_llm(messages) == "response 2"
+        assert len(generate) == 2
+        assert len(semantic_cache) == 0
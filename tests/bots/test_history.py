@@ -0,0 +1,31 @@
+from marvin.bot.history import InMemoryHistory
+from marvin.models.threads import Message
+from marvin.utilities.strings import count_tokens
+
+
+class TestInMemoryHistory:
+    async def test_get_messages_in_chronological_order(self):
+        history = InMemoryHistory()
+        for i in range(3):
+            await history.add_message(Message(role="user", content=f"message {i}"))
+
+        messages = await history.get_messages()
+        assert [m.content for m in messages] == [f"message {i}" for i in range(3)]
+
+    async def test_max_tokens_keeps_most_recent_messages(self):
+        history = InMemoryHistory()
+        for i in range(5):
+            await history.add_message(Message(role="user", content=f"message {i}"))
+
+        max_tokens = 2 * count_tokens("message 0")
+        messages = [m async for m in history.iter_messages(max_tokens=max_tokens)]
+        assert [m.content for m in messages] == ["message 3", "message 4"]
+
+    async def test_tail_by_tokens_respects_max_messages(self):
+        history = InMemoryHistory(max_messages=2)
+        for i in range(5):
+            await history.add_message(Message(role="user", content=f"message {i}"))
+
+        messages = await history.tail_by_tokens(max_tokens=1000)
+        assert [m.content for m in messages] == ["message 3", "message 4"]
+        assert set(history._token_counts) == {m.id for m in messages}
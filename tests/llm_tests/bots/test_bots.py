@@ -67,6 +67,15 @@ class TestStreamingBotResponse:
         assert isinstance(buffer[-1], list)
         assert "".join(buffer[-1]) == response.content
 
+    async def test_stream(self):
+        bot = Bot()
+        tokens = [token async for token in bot.stream("hello!")]
+
+        assert len(tokens) > 1
+        history = await bot.history.get_messages()
+        response = "".join(t.content for t in tokens if t.round == tokens[-1].round)
+        assert response == history[-1].content
+
 
 class TestResponseFormatShorthand:
     async def test_int(self):
@@ -0,0 +1,45 @@
+import numpy as np
+from marvin.utilities.cache import SemanticCache
+
+
+class TestSemanticCache:
+    def test_lookup_empty_cache(self):
+        cache = SemanticCache()
+        assert cache.lookup(np.array([1.0, 0.0])) is None
+
+    def test_lookup_similar_key(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.add(np.array([1.0, 0.0]), "a")
+        assert cache.lookup(np.array([2.0, 0.1])) == "a"
+
+    def test_lookup_dissimilar_key(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.add(np.array([1.0, 0.0]), "a")
+        assert cache.lookup(np.array([0.0, 1.0])) is None
+
+    def test_lookup_returns_most_similar(self):
+        cache = SemanticCache(threshold=0.5)
+        cache.add(np.array([1.0, 0.0]), "a")
+        cache.add(np.array([1.0, 1.0]), "b")
+        assert cache.lookup(np.array([1.0, 0.9])) == "b"
+
+    def test_namespaces_are_isolated(self):
+        cache = SemanticCache()
+        cache.add(np.array([1.0, 0.0]), "a", namespace="x")
+        assert cache.lookup(np.array([1.0, 0.0])) is None
+        assert cache.lookup(np.array([1.0, 0.0]), namespace="y") is None
+        assert cache.lookup(np.array([1.0, 0.0]), namespace="x") == "a"
+
+    def test_max_size_evicts_oldest(self):
+        cache = SemanticCache(max_size=2)
+        cache.add(np.array([1.0, 0.0, 0.0]), "a")
+        cache.add(np.array([0.0, 1.0, 0.0]), "b")
+        cache.add(np.array([0.0, 0.0, 1.0]), "c")
+        assert len(cache) == 2
+        assert cache.lookup(np.array([1.0, 0.0, 0.0])) is None
+        assert cache.lookup(np.array([0.0, 0.0, 1.0])) == "c"
+
+    def test_expired_entries_are_ignored(self):
+        cache = SemanticCache(ttl=0)
+        cache.add(np.array([1.0, 0.0]), "a")
+        assert cache.lookup(np.array([1.0, 0.0])) is None